@@ -0,0 +1,56 @@
+"""Benchmark the import time of pysecurityspy.
+
+Each scenario runs in a fresh interpreter so nothing is cached between
+runs. Run from the repository root:
+
+    python benchmarks/bench_import.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "constants only": "import pysecurityspy; pysecurityspy.RECORDING_MODES",
+    "server class": "from pysecurityspy import SecuritySpyServer",
+    "events class": "from pysecurityspy import SecuritySpyEvents",
+}
+
+CHILD = """
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, "aiohttp" in sys.modules)
+"""
+
+def run_once(statement: str):
+    """Returns the import time and whether aiohttp was loaded."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(statement=statement)],
+        cwd=root,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for name, statement in SCENARIOS.items():
+        times = []
+        for _ in range(args.runs):
+            elapsed, aiohttp_loaded = run_once(statement)
+            times.append(elapsed * 1000)
+        print(
+            f"{name:<16} median {statistics.median(times):7.2f} ms  "
+            f"min {min(times):7.2f} ms  aiohttp loaded: {aiohttp_loaded}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark the ++systemInfo parser backends.
+
+Compares the previous code path, which parsed the document with
+ElementTree once for server information and once for the camera list,
+against a single `parse_system_info` call with each available backend.
+Run from the repository root:
+
+    python benchmarks/bench_parser.py --cameras 16 --runs 2000
+"""
+import argparse
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pysecurityspy.const import PARSER_ETREE, PARSER_LXML, PARSER_SCANNER  # noqa: E402
+from pysecurityspy.errors import ResultError  # noqa: E402
+from pysecurityspy.parser import CAMERA_FIELDS, parse_system_info  # noqa: E402
+from pysecurityspy.simulator import system_info_xml  # noqa: E402
+
+_HEADER = '<?xml version="1.0" encoding="utf-8"?><system><server><name>S</name><version>1</version></server>'
+
+# Documents the backends must read as etree does, or reject with ResultError.
+EDGE_CASES = [
+    _HEADER + '<cameralist><camera id="1"><number>1</number></camera>\n<camera\n><number>2</number></camera></cameralist></system>',
+    _HEADER + '<cameralist><camera><name><![CDATA[A<B]]> &amp; C</name></camera></cameralist></system>',
+    _HEADER + '<cameralist><camera><extra><name>X</name></extra><number>1</number></camera></cameralist></system>',
+    _HEADER + '<cameralist><camera><name>A<!-- note -->B<b/>C</name></camera></cameralist></system>',
+    _HEADER + '<cameralist><camera/><camera><name/><name>late</name></camera></cameralist></system>',
+    '<system><other><server><name>nested</name></server></other><cameralist/></system>',
+    _HEADER + '<cameralist><camera><name>&eacute;</name></camera></cameralist></system>',
+]
+
+def legacy(document: str) -> None:
+    """The ElementTree walk used before the parser module existed."""
+    data = ET.fromstring(document)
+    for item in data.iterfind("server"):
+        item.findtext("name")
+        item.findtext("version")
+    cameras = ET.fromstring(document)
+    for item in cameras.iterfind("cameralist/camera"):
+        for field in CAMERA_FIELDS:
+            item.findtext(field)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    document = system_info_xml(args.cameras)
+    backends = [PARSER_ETREE, PARSER_SCANNER]
+    try:
+        import lxml.etree  # noqa: F401
+        backends.insert(1, PARSER_LXML)
+    except ImportError:
+        print("lxml not installed, skipping the lxml backend")
+
+    reference = parse_system_info(document, PARSER_ETREE)
+    for backend in backends:
+        assert parse_system_info(document, backend) == reference, backend
+    for case in EDGE_CASES:
+        try:
+            expected = parse_system_info(case, PARSER_ETREE)
+        except ResultError:
+            expected = None
+        for backend in backends:
+            try:
+                assert parse_system_info(case, backend) == expected, (backend, case)
+            except ResultError:
+                pass
+
+    baseline = timeit.timeit(lambda: legacy(document), number=args.runs) / args.runs
+    print(f"{args.cameras} cameras, {len(document)} bytes, {args.runs} runs")
+    print(f"{'legacy (2 parses)':<18} {baseline * 1e6:8.1f} us")
+    for backend in backends:
+        elapsed = timeit.timeit(lambda: parse_system_info(document, backend), number=args.runs) / args.runs
+        print(f"{backend:<18} {elapsed * 1e6:8.1f} us  {baseline / elapsed:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-"""Init file for pysecurityspy."""
-from pysecurityspy.server import SecuritySpyServer
-from pysecurityspy.events import SecuritySpyEvents
+"""Init file for pysecurityspy.
+
+Constants and errors are imported eagerly as they are cheap. The client
+classes pull in aiohttp and are only imported on first attribute access.
+"""
+from importlib import import_module
+
 from pysecurityspy.errors import (
+    CircuitOpenError,
     InvalidCredentials,
     RequestError,
     ResultError,
@@ -11,10 +16,29 @@ from pysecurityspy.const import (
     RECORDING_MODE_MOTION,
     RECORDING_MODE_ACTION,
     RECORDING_MODE_NEVER,
+    RECORDING_MODES,
     EVENT_TYPES,
     EVENT_TYPE_MOTION,
     EVENT_TYPE_CLASIFY,
     EVENT_TYPE_TRIGGER_M,
     EVENT_TYPE_FILE,
     MOTION_TRIGGERS,
+    TRIGGER_TYPE,
 )
+
+_LAZY_ATTRIBUTES = {
+    "SecuritySpyServer": "pysecurityspy.server",
+    "SecuritySpyEvents": "pysecurityspy.events",
+}
+
+def __getattr__(name):
+    """Import the client classes on first use (PEP 562)."""
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
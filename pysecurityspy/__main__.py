@@ -0,0 +1,6 @@
+"""Allow running pysecurityspy as a module: python -m pysecurityspy."""
+import sys
+
+from pysecurityspy.cli import main
+
+sys.exit(main())
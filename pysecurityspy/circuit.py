@@ -0,0 +1,116 @@
+"""Circuit breaker used to fail fast against unresponsive endpoints."""
+import logging
+import time
+
+from pysecurityspy.const import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    CIRCUIT_CLOSED,
+    CIRCUIT_OPEN,
+    CIRCUIT_HALF_OPEN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """Tracks consecutive failures for a single endpoint or camera.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are rejected without touching the network. Once
+    `reset_timeout` seconds have passed a single probe request is let
+    through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+    ):
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._last_error = None
+
+    @property
+    def name(self):
+        """Endpoint or camera the circuit guards."""
+        return self._name
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        if self._state == CIRCUIT_OPEN and self._retry_due():
+            return CIRCUIT_HALF_OPEN
+        return self._state
+
+    @property
+    def failures(self) -> int:
+        """Number of consecutive failures."""
+        return self._failures
+
+    @property
+    def last_error(self) -> str:
+        """Message of the most recent failure."""
+        return self._last_error
+
+    @property
+    def probing(self) -> bool:
+        """Return True while the half-open probe request is in flight."""
+        return self._probing
+
+    @property
+    def healthy(self) -> bool:
+        """Return True if the circuit is closed."""
+        return self._state == CIRCUIT_CLOSED
+
+    def _retry_due(self) -> bool:
+        return time.monotonic() - self._opened_at >= self._reset_timeout
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self._state == CIRCUIT_CLOSED:
+            return True
+        if self._probing:
+            return False
+        if self._state == CIRCUIT_OPEN and not self._retry_due():
+            return False
+        self._state = CIRCUIT_HALF_OPEN
+        self._probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """Give the probe slot back without recording an outcome."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        if self._state != CIRCUIT_CLOSED:
+            _LOGGER.debug("Circuit %s closed", self._name)
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._probing = False
+        self._last_error = None
+
+    def record_failure(self, error=None) -> None:
+        """Count a failed request, opening the circuit when needed."""
+        self._failures += 1
+        self._probing = False
+        self._last_error = str(error) if error is not None else None
+        if self._state == CIRCUIT_HALF_OPEN or self._failures >= self._failure_threshold:
+            if self._state != CIRCUIT_OPEN:
+                _LOGGER.debug("Circuit %s opened after %s failures", self._name, self._failures)
+            self._state = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+
+    def as_dict(self) -> dict:
+        """Return the health state as a dictionary."""
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "last_error": self._last_error,
+        }
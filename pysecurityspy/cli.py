@@ -0,0 +1,289 @@
+"""Command line tool for monitoring and load testing a SecuritySpy server."""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+from aiohttp import ClientSession
+
+from pysecurityspy.const import STREAM_PROFILE_MAIN, STREAM_PROFILES
+from pysecurityspy.errors import SecuritySpyError
+from pysecurityspy.events import SecuritySpyEvents
+from pysecurityspy.registry import CameraRegistry
+from pysecurityspy.server import SecuritySpyServer
+
+_LOGGER = logging.getLogger(__name__)
+
+def percentile(values, pct: float) -> float:
+    """Returns the nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+def _connection(args) -> dict:
+    """Returns connection settings from the command line or settings.json."""
+    settings = {}
+    if args.settings and os.path.exists(args.settings):
+        with open(args.settings) as json_file:
+            settings = json.load(json_file)["connection"]
+    for key in ("host", "port", "username", "password"):
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+    if args.ssl:
+        settings["use_ssl"] = True
+    missing = [key for key in ("host", "port", "username", "password") if key not in settings]
+    if missing:
+        raise SystemExit(f"Missing connection settings: {', '.join(missing)}")
+    return {
+        "host": settings["host"],
+        "port": int(settings["port"]),
+        "username": settings["username"],
+        "password": settings["password"],
+        "use_ssl": _to_bool(settings.get("use_ssl", False)),
+    }
+
+async def tail_events(args) -> None:
+    """Print events as they arrive, with periodic rate statistics."""
+    conn = _connection(args)
+    cameras = set(args.camera or [])
+    types = set(args.type or [])
+    counts = {}
+    started = time.monotonic()
+    last_report = started
+
+    def on_event(camera_id, event_type, data):
+        nonlocal last_report
+        if cameras and camera_id not in cameras:
+            return
+        if types and event_type not in types:
+            return
+        counts[event_type] = counts.get(event_type, 0) + 1
+        print(
+            f"{data['timestamp']} camera={camera_id} name={data['name']} "
+            f"type={event_type} trigger={data['trigger_type']} "
+            f"motion={data['is_motion']}",
+            flush=True,
+        )
+        now = time.monotonic()
+        if args.stats_interval and now - last_report >= args.stats_interval:
+            elapsed = now - started
+            total = sum(counts.values())
+            rates = " ".join(f"{key}={value / elapsed:.2f}/s" for key, value in sorted(counts.items()))
+            metrics = events.metrics
+            print(
+                f"# {total} events in {elapsed:.1f}s ({total / elapsed:.2f}/s) {rates} "
+                f"lag avg={metrics.avg_lag:.1f}s max={metrics.max_lag:.1f}s queue max={metrics.max_queue_depth}",
+                flush=True,
+            )
+            last_report = now
+
+    async with ClientSession() as session:
+        events = SecuritySpyEvents(session=session, lag_threshold=args.lag_threshold, **conn)
+        await events.registerCameraCallback(on_event)
+        await events.event_loop()
+
+async def record_events(args) -> None:
+    """Record the raw event stream to a file."""
+    conn = _connection(args)
+    async with ClientSession() as session:
+        events = SecuritySpyEvents(session=session, **conn)
+        try:
+            await asyncio.wait_for(events.event_loop(record_to=args.output), args.duration)
+        except asyncio.TimeoutError:
+            pass
+    print(f"Recorded {events.metrics.events_received} events to {args.output}")
+
+async def replay_events(args) -> None:
+    """Replay a recorded event stream and report ingest throughput."""
+    from pysecurityspy.replay import ReplayStream
+
+    source = ReplayStream(args.recording, args.speed)
+    events = SecuritySpyEvents("replay", 0, "", "")
+    started = time.perf_counter()
+    await events.replay(source)
+    elapsed = time.perf_counter() - started
+    metrics = events.metrics
+
+    print(f"lines:       {len(source)}")
+    print(f"events:      {metrics.events_dispatched} dispatched")
+    print(f"duration:    {elapsed:.3f}s")
+    print(f"throughput:  {metrics.events_dispatched / elapsed:.1f} events/s")
+    print(f"dispatch:    avg {metrics.avg_dispatch_time * 1e6:.1f} us, max {metrics.max_dispatch_time * 1e6:.1f} us")
+    print(f"queue max:   {metrics.max_queue_depth}")
+
+async def dump_cameras(args) -> None:
+    """Print the current state of every camera as JSON."""
+    conn = _connection(args)
+    async with ClientSession() as session:
+        server = SecuritySpyServer(session=session, **conn)
+        result = {"cameras": await server.update()}
+        if args.server_info:
+            result["server"] = await server.get_server_information()
+        if args.health:
+            result["health"] = {str(key): value for key, value in server.health.items()}
+    print(json.dumps(result, indent=2, default=str))
+
+async def fetch_snapshots(args) -> None:
+    """Save a snapshot from each camera, fetching them concurrently."""
+    conn = _connection(args)
+    os.makedirs(args.output_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with ClientSession() as session:
+        server = SecuritySpyServer(session=session, **conn)
+        camera_ids = args.camera or list(await server.update())
+
+        async def fetch(camera_id):
+            async with semaphore:
+                start = time.monotonic()
+                try:
+                    image = await server.get_snapshot_image(camera_id, args.profile)
+                except SecuritySpyError as err:
+                    print(f"camera {camera_id}: {err}", file=sys.stderr)
+                    return
+                filename = os.path.join(args.output_dir, f"snapshot_{camera_id}.jpg")
+                with open(filename, "wb") as img_file:
+                    img_file.write(image)
+                print(f"camera {camera_id}: {len(image)} bytes in {time.monotonic() - start:.3f}s -> {filename}")
+
+        await asyncio.gather(*(fetch(camera_id) for camera_id in camera_ids))
+
+async def load_test(args) -> None:
+    """Generate load against a server and report throughput and latency."""
+    simulator = None
+    if args.local:
+        from pysecurityspy.simulator import SecuritySpySimulator
+
+        simulator = SecuritySpySimulator(cameras=args.cameras, latency=args.latency)
+        port = await simulator.start()
+        conn = {"host": simulator.host, "port": port, "username": "user", "password": "pass", "use_ssl": False}
+    else:
+        conn = _connection(args)
+
+    latencies = []
+    errors = 0
+    remaining = args.requests
+
+    try:
+        async with ClientSession() as session:
+            # Keep the circuit closed and use a private registry so every
+            # request really hits the server.
+            server = SecuritySpyServer(
+                session=session,
+                failure_threshold=args.requests + 1,
+                registry=CameraRegistry(),
+                **conn,
+            )
+            camera_ids = list(await server.update())
+            if args.target == "image" and not camera_ids:
+                raise SystemExit("The server has no cameras to request images from")
+
+            async def worker():
+                nonlocal errors, remaining
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        if args.target == "image":
+                            await server.get_snapshot_image(camera_ids[remaining % len(camera_ids)])
+                        else:
+                            await server.update()
+                    except SecuritySpyError:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+    finally:
+        if simulator is not None:
+            await simulator.stop()
+
+    print(f"target:      {args.target} ({conn['host']}:{conn['port']})")
+    print(f"requests:    {len(latencies)} ok, {errors} failed")
+    if simulator is not None:
+        print(f"served:      {sum(simulator.requests.values())} requests (including setup)")
+    print(f"concurrency: {args.concurrency}")
+    print(f"duration:    {elapsed:.3f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    for pct in (50, 90, 99):
+        print(f"p{pct}:         {percentile(latencies, pct) * 1000:.2f} ms")
+    print(f"max:         {max(latencies, default=0) * 1000:.2f} ms")
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser for the command line tool."""
+    parser = argparse.ArgumentParser(prog="python -m pysecurityspy", description=__doc__)
+    parser.add_argument("--settings", default="settings.json", help="JSON settings file (default: settings.json)")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--ssl", action="store_true", help="Use https")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug logging")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    events = subparsers.add_parser("events", help="Tail the event stream")
+    events.add_argument("--camera", type=int, action="append", help="Only show this camera (repeatable)")
+    events.add_argument("--type", action="append", help="Only show this event type (repeatable)")
+    events.add_argument("--stats-interval", type=float, default=10, help="Seconds between rate reports, 0 to disable")
+    events.add_argument("--lag-threshold", type=float, help="Warn when events are this many seconds behind")
+    events.set_defaults(func=tail_events)
+
+    record = subparsers.add_parser("record", help="Record the raw event stream to a file")
+    record.add_argument("output", help="Recording file to write")
+    record.add_argument("--duration", type=float, default=60, help="Seconds to record")
+    record.set_defaults(func=record_events)
+
+    replay = subparsers.add_parser("replay", help="Replay a recorded event stream offline")
+    replay.add_argument("recording", help="Recording file to read")
+    replay.add_argument("--speed", type=float, default=0, help="1 for original timing, 0 for as fast as possible")
+    replay.set_defaults(func=replay_events)
+
+    cameras = subparsers.add_parser("cameras", help="Dump camera state as JSON")
+    cameras.add_argument("--server-info", action="store_true", help="Include server name and version")
+    cameras.add_argument("--health", action="store_true", help="Include circuit breaker health")
+    cameras.set_defaults(func=dump_cameras)
+
+    snapshots = subparsers.add_parser("snapshots", help="Save snapshots from cameras")
+    snapshots.add_argument("--camera", type=int, action="append", help="Camera to fetch (repeatable, default all)")
+    snapshots.add_argument("--output-dir", default=".", help="Directory for the JPEG files")
+    snapshots.add_argument("--concurrency", type=int, default=4)
+    snapshots.add_argument("--profile", choices=list(STREAM_PROFILES), default=STREAM_PROFILE_MAIN)
+    snapshots.set_defaults(func=fetch_snapshots)
+
+    load = subparsers.add_parser("loadtest", help="Measure throughput and latency")
+    load.add_argument("--target", choices=["systeminfo", "image"], default="systeminfo")
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=10)
+    load.add_argument("--local", action="store_true", help="Run against an in-process stand-in server")
+    load.add_argument("--cameras", type=int, default=8, help="Cameras on the stand-in server")
+    load.add_argument("--latency", type=float, default=0.0, help="Added response delay of the stand-in server")
+    load.set_defaults(func=load_test)
+
+    return parser
+
+def main(argv=None) -> int:
+    """Run the command line tool."""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    try:
+        asyncio.run(args.func(args))
+    except KeyboardInterrupt:
+        pass
+    except SecuritySpyError as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
+    return 0
@@ -27,6 +27,18 @@ EVENT_TYPES = [
     EVENT_TYPE_FILE,
 ]
 
+STREAM_EVENT_TYPES = [
+    EVENT_TYPE_MOTION,
+    EVENT_TYPE_CLASIFY,
+    EVENT_TYPE_TRIGGER_M,
+    EVENT_TYPE_FILE,
+]
+
+SNAPSHOT_TRIGGERS = [
+    EVENT_TYPE_TRIGGER_M,
+    EVENT_TYPE_CLASIFY,
+]
+
 MOTION_TRIGGERS = [
     EVENT_TYPE_TRIGGER_M,
     EVENT_TYPE_FILE,
@@ -43,4 +55,52 @@ TRIGGER_TYPE = {
     64: "Manual trigger",
     128: "Human",
     256: "Vehicle",
-}
\ No newline at end of file
+}
+
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_TIMEOUT = 30
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+CIRCUIT_SERVER = "server"
+
+PARSER_ETREE = "etree"
+PARSER_LXML = "lxml"
+PARSER_SCANNER = "scanner"
+
+PARSER_BACKENDS = [
+    PARSER_ETREE,
+    PARSER_LXML,
+    PARSER_SCANNER,
+]
+
+REGISTRY_MAX_AGE = 60
+
+PIPELINE_THREAD = "thread"
+PIPELINE_PROCESS = "process"
+PIPELINE_MAX_QUEUE = 8
+PIPELINE_JPEG_QUALITY = 75
+
+PREFETCH_MIN_INTERVAL = 5
+PREFETCH_MAX_AGE = 10
+
+EVENT_QUEUE_SIZE = 1000
+
+SHARED_STATE_NAME = "pysecurityspy"
+SHARED_STATE_MAX_CAMERAS = 64
+
+STREAM_PROFILE_MAIN = "main"
+STREAM_PROFILE_SUB = "sub"
+STREAM_PROFILE_THUMBNAIL = "thumbnail"
+
+# Maximum width and frame rate of each profile, None keeps the camera width.
+STREAM_PROFILES = {
+    STREAM_PROFILE_MAIN: (None, 15),
+    STREAM_PROFILE_SUB: (640, 10),
+    STREAM_PROFILE_THUMBNAIL: (320, 2),
+}
+
+DEFAULT_IMAGE_WIDTH = 1920
+DEFAULT_IMAGE_HEIGHT = 1080
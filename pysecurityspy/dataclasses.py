@@ -29,6 +29,7 @@ class CameraData:
         self._recording_mode = data["recording_mode"]
         self._rtsp_video = data["rtsp_video"]
         self._still_image = data["still_image"]
+        self._stream_profiles = data.get("stream_profiles", {})
 
     @property
     def uid(self) -> int:
@@ -110,6 +111,11 @@ class CameraData:
         """Still Image Address."""
         return self._still_image
 
+    @property
+    def stream_profiles(self) -> dict:
+        """Size, frame rate and addresses of the main, sub and thumbnail streams."""
+        return self._stream_profiles
+
 class RecordingSettings:
     """A representation of Recording Mode Settings."""
     def __init__(self, data):
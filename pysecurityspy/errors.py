@@ -22,3 +22,13 @@ class ResultError(SecuritySpyError):
     """Define an error related to the result returned from a request."""
 
     pass
+
+class CircuitOpenError(RequestError):
+    """Define an error raised when a request is rejected by an open circuit."""
+
+    pass
+
+class QueueFullError(SecuritySpyError):
+    """Define an error raised when a processing queue has no free slots."""
+
+    pass
@@ -2,20 +2,27 @@
 import logging
 import asyncio
 import sys
+import time
 from aiohttp import ClientSession, ClientTimeout
 from aiohttp.client_exceptions import ClientError
 from typing import Optional
 from base64 import b64encode
-import xml.etree.ElementTree as ET
 from pysecurityspy.errors import (
     InvalidCredentials,
     RequestError,
     ResultError,
 )
 from pysecurityspy.dataclasses import EventData
+from pysecurityspy.metrics import StreamMetrics, parse_timestamp
+from pysecurityspy.parser import parse_system_info
+from pysecurityspy.registry import CameraRegistry, get_registry
+from pysecurityspy.replay import StreamRecorder, record_stream
 from pysecurityspy.const import (
     DEFAULT_TIMEOUT,
+    EVENT_QUEUE_SIZE,
+    REGISTRY_MAX_AGE,
     EVENT_TYPES,
+    STREAM_EVENT_TYPES,
     EVENT_TYPE_MOTION,
     EVENT_TYPE_CLASIFY,
     EVENT_TYPE_TRIGGER_M,
@@ -35,6 +42,8 @@ class SecuritySpyEvents:
         password: str,
         use_ssl: bool = False,
         session: Optional[ClientSession] = None,
+        registry: Optional[CameraRegistry] = None,
+        lag_threshold: Optional[float] = None,
     ):
         self._host = host
         self._port = port
@@ -45,6 +54,9 @@ class SecuritySpyEvents:
         self._auth = b64encode(bytes(self._username + ":" + self._password, "utf-8")).decode()
         self._base = "http" if not use_ssl else "https"
         self._callbacks = []
+        self._camera_callbacks = []
+        self._registry = registry or get_registry(self._base, host, port, self._auth)
+        self.metrics = StreamMetrics(lag_threshold)
         self.event_data = {}
 
     @property
@@ -52,77 +64,175 @@ class SecuritySpyEvents:
         """ Returns a JSON formatted list of Events. """
         return self.event_data
 
+    @property
+    def registry(self) -> CameraRegistry:
+        """Returns the camera registry shared with the server client."""
+        return self._registry
+
     async def registerCallback(self, callback):
         """.Handle Callback Data."""
         self._callbacks.append(callback)
 
-    async def event_loop(self) -> None:
-        """Main Event Loop listening for data."""
+    async def registerCameraCallback(self, callback):
+        """Handle Callback Data for the single camera an event refers to.
+
+        Called as callback(camera_id, event_type, data) for every event in
+        STREAM_EVENT_TYPES, including MOTION and CLASSIFY.
+        """
+        self._camera_callbacks.append(callback)
+
+    async def registerLagCallback(self, callback):
+        """Handle the alarm raised when event lag exceeds lag_threshold.
+
+        Called as callback(camera_id, lag) once each time the stream falls
+        behind; the threshold can be changed through metrics.lag_threshold.
+        """
+        self.metrics.add_alarm_callback(callback)
+
+    async def event_loop(self, record_to: Optional[str] = None) -> None:
+        """Main Event Loop listening for data.
+
+        With `record_to` the raw stream is also written to that file, for
+        later use with `replay`.
+        """
+
+        # Retrieve Camera details and create JSON structure, reusing
+        # systemInfo if the server client fetched it recently
+        system_info = await self._registry.async_get(self._fetch_system_info, REGISTRY_MAX_AGE)
+        for item in system_info["cameras"]:
+            self._add_camera(int(item["number"]), item["name"])
 
-        # Retrieve Camera details and create JSON structure
-        endpoint = f"{self._base}://{self._host}:{self._port}/++systemInfo&auth={self._auth}"
-        response = await self.async_request("get", endpoint)
-        cameras = ET.fromstring(response)
-        for item in cameras.iterfind('cameralist/camera'):
-            uid = int(item.findtext("number"))
-            name = item.findtext("name")
-            item = {
-                uid: {
-                    "name": name,
-                    "timestamp": None,
-                    "camera_id": 0,
-                    "event_type": 0,
-                    "box_pos_x": 0,
-                    "box_pos_y": 0,
-                    "box_pos_h": 0,
-                    "box_pos_w": 0,
-                    "trigger_type": 0,
-                    "classify_score": 0,
-                    "classify_type": None,
-                    "is_motion": False,
-                }
-            }
-            self.event_data.update(item)
-        
         # Start the Event Loop Stream
         endpoint = f"{self._base}://{self._host}:{self._port}/++eventStream?version=3&format=multipart&auth={self._auth}"
         _LOGGER.debug(f"{endpoint}")
         try:
             async with self._session.request("get", endpoint) as resp:
-                async for line in resp.content:
-                    data = line.decode()
-                    if data[:14].isnumeric():
-                        event_arr = data.split(" ")
-                        camera_id = event_arr[2]
-                        event_id = event_arr[3]
-                        if event_id in EVENT_TYPES:
-                            camera_id = int(camera_id)
-                            if event_id == EVENT_TYPE_MOTION:
-                                self.event_data[camera_id]["box_pos_x"] = int(event_arr[4])
-                                self.event_data[camera_id]["box_pos_y"] = int(event_arr[5])
-                                self.event_data[camera_id]["box_pos_w"] = int(event_arr[6])
-                                self.event_data[camera_id]["box_pos_h"] = int(event_arr[7])
-                            elif event_id == EVENT_TYPE_TRIGGER_M:
-                                self.event_data[camera_id]["trigger_type"] = int(event_arr[4])
-                                self.event_data[camera_id]["is_motion"] = True
-                            elif event_id == EVENT_TYPE_CLASIFY:
-                                self.event_data[camera_id]["classify_type"] = event_arr[4]
-                                self.event_data[camera_id]["classify_score"] = int(event_arr[5])
-                            elif event_id == EVENT_TYPE_FILE:
-                                self.event_data[camera_id]["is_motion"] = False
-                            self.event_data[camera_id]["timestamp"] = event_arr[0]
-                            self.event_data[camera_id]["event_type"] = event_arr[3]
-
-                            for callback in self._callbacks:
-                                callback(self.events)
-
-                    await asyncio.sleep(0.1)
+                if record_to is None:
+                    await self._process_stream(resp.content)
+                else:
+                    with StreamRecorder(record_to) as recorder:
+                        await self._process_stream(record_stream(resp.content, recorder))
 
         except asyncio.TimeoutError:
             raise RequestError("Request to endpoint timed out: {endpoint}")
         except ClientError as err:
             raise RequestError(f"Error requesting data from {endpoint}: {err}")
 
+    async def replay(self, source) -> None:
+        """Feed events from a recorded stream instead of the server.
+
+        `source` is a ReplayStream or any async iterable of stream lines.
+        Cameras are added as they appear, named from the registry if it
+        holds systemInfo for this server.
+
+        The recorded timestamps are in the past, so lag is measured from
+        the moment a line is read from `source` instead of from its
+        timestamp: it shows how far dispatching falls behind the replay.
+        """
+        await self._process_stream(source, replay=True)
+
+    async def _process_stream(self, stream, replay: bool = False) -> None:
+        """Read event lines from `stream` and dispatch them to the callbacks.
+
+        Reading and dispatching run as separate tasks joined by a bounded
+        queue, so the queue depth shows how far dispatching falls behind.
+        """
+        queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        reader = asyncio.ensure_future(self._read_stream(stream, queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                self._dispatch(*item, queue.qsize(), replay)
+        finally:
+            if not reader.done():
+                reader.cancel()
+        await reader
+
+    async def _read_stream(self, stream, queue) -> None:
+        """Queue every event line of `stream` with its arrival time, followed by None."""
+        try:
+            async for line in stream:
+                if line[:14].isdigit():
+                    await queue.put((line, time.monotonic()))
+                    self.metrics.received(queue.qsize())
+        except asyncio.CancelledError:
+            # The dispatcher has stopped reading the queue, so waiting for
+            # room for the sentinel could block forever.
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    def _dispatch(self, line: bytes, arrived: float, queue_depth: int, replay: bool = False) -> None:
+        """Update event data from an event line and call the callbacks."""
+        started = time.perf_counter()
+        data = line.decode()
+        event_arr = data.split(" ")
+        camera_id = event_arr[2]
+        event_id = event_arr[3]
+        if event_id not in STREAM_EVENT_TYPES:
+            return
+        camera_id = int(camera_id)
+        if camera_id not in self.event_data:
+            item = self._registry.camera(camera_id)
+            self._add_camera(camera_id, item["name"] if item else None)
+        if event_id == EVENT_TYPE_MOTION:
+            self.event_data[camera_id]["box_pos_x"] = int(event_arr[4])
+            self.event_data[camera_id]["box_pos_y"] = int(event_arr[5])
+            self.event_data[camera_id]["box_pos_w"] = int(event_arr[6])
+            self.event_data[camera_id]["box_pos_h"] = int(event_arr[7])
+        elif event_id == EVENT_TYPE_TRIGGER_M:
+            self.event_data[camera_id]["trigger_type"] = int(event_arr[4])
+            self.event_data[camera_id]["is_motion"] = True
+        elif event_id == EVENT_TYPE_CLASIFY:
+            self.event_data[camera_id]["classify_type"] = event_arr[4]
+            self.event_data[camera_id]["classify_score"] = int(event_arr[5])
+        elif event_id == EVENT_TYPE_FILE:
+            self.event_data[camera_id]["is_motion"] = False
+        if event_id in EVENT_TYPES:
+            self.event_data[camera_id]["timestamp"] = event_arr[0]
+            self.event_data[camera_id]["event_type"] = event_arr[3]
+
+            for callback in self._callbacks:
+                callback(self.events)
+        for callback in self._camera_callbacks:
+            callback(camera_id, event_id, self.event_data[camera_id])
+
+        if replay:
+            lag = time.monotonic() - arrived
+        else:
+            lag = time.time() - parse_timestamp(event_arr[0])
+        self.metrics.dispatched(camera_id, lag, time.perf_counter() - started, queue_depth)
+
+    def _add_camera(self, uid: int, name: str) -> None:
+        """Create the event structure for a camera."""
+        item = {
+            uid: {
+                "name": name,
+                "timestamp": None,
+                "camera_id": 0,
+                "event_type": 0,
+                "box_pos_x": 0,
+                "box_pos_y": 0,
+                "box_pos_h": 0,
+                "box_pos_w": 0,
+                "trigger_type": 0,
+                "classify_score": 0,
+                "classify_type": None,
+                "is_motion": False,
+            }
+        }
+        self.event_data.update(item)
+
+    async def _fetch_system_info(self) -> dict:
+        """Fetch and parse ++systemInfo."""
+        endpoint = f"{self._base}://{self._host}:{self._port}/++systemInfo&auth={self._auth}"
+        response = await self.async_request("get", endpoint)
+        return parse_system_info(response)
+
     async def async_request(self, method: str, endpoint: str, rawdata: bool = False) -> dict:
         """Make a request against the SmartWeather API."""
 
@@ -0,0 +1,185 @@
+"""Snapshot post-processing run off the event loop.
+
+Decoding, cropping and resizing JPEG images is CPU bound and would stall
+event ingestion if done on the asyncio loop, so `SnapshotPipeline` runs it
+in a thread or process pool. It requires Pillow, which is an optional
+dependency of this package.
+"""
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from pysecurityspy.const import (
+    PIPELINE_THREAD,
+    PIPELINE_PROCESS,
+    PIPELINE_MAX_QUEUE,
+    PIPELINE_JPEG_QUALITY,
+    SNAPSHOT_TRIGGERS,
+)
+from pysecurityspy.errors import QueueFullError, SecuritySpyError
+
+_LOGGER = logging.getLogger(__name__)
+
+def process_image(
+    image: bytes,
+    crop: tuple = None,
+    size: tuple = None,
+    quality: int = PIPELINE_JPEG_QUALITY,
+    source_size: tuple = None,
+) -> bytes:
+    """Crop, resize and re-encode a JPEG image.
+
+    `crop` is an (x, y, width, height) box, for instance the MOTION
+    bounding box, given in `source_size` pixels (the camera resolution).
+    It is scaled to the snapshot size. `size` is the maximum
+    (width, height) of the result, keeping the aspect ratio.
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image)) as img:
+        img.load()
+        if crop is not None and crop[2] > 0 and crop[3] > 0:
+            scale_x = scale_y = 1.0
+            if source_size:
+                scale_x = img.width / source_size[0]
+                scale_y = img.height / source_size[1]
+            left = max(0, int(crop[0] * scale_x))
+            top = max(0, int(crop[1] * scale_y))
+            right = min(img.width, int((crop[0] + crop[2]) * scale_x))
+            bottom = min(img.height, int((crop[1] + crop[3]) * scale_y))
+            if right > left and bottom > top:
+                img = img.crop((left, top, right, bottom))
+        if size is not None:
+            img.thumbnail(size)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        output = io.BytesIO()
+        img.save(output, format="JPEG", quality=quality)
+        return output.getvalue()
+
+class SnapshotPipeline:
+    """Runs `process_image` in a thread or process pool.
+
+    At most `max_queue` images are fetched, queued or processing at any
+    time; `submit` raises QueueFullError beyond that, and motion triggered
+    jobs are dropped, so a burst of events cannot build an unbounded backlog.
+    """
+
+    def __init__(
+        self,
+        executor: str = PIPELINE_THREAD,
+        max_workers: int = None,
+        max_queue: int = PIPELINE_MAX_QUEUE,
+        size: tuple = None,
+        quality: int = PIPELINE_JPEG_QUALITY,
+        crop_to_motion: bool = True,
+    ):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise ImportError("SnapshotPipeline requires Pillow: pip install Pillow")
+
+        if executor == PIPELINE_PROCESS:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        elif executor == PIPELINE_THREAD:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pysecurityspy")
+        else:
+            raise ValueError(f"Unknown executor {executor}, use {PIPELINE_THREAD} or {PIPELINE_PROCESS}")
+        self._max_queue = max_queue
+        self._size = size
+        self._quality = quality
+        self._crop_to_motion = crop_to_motion
+        self._pending = 0
+        self._results = {}
+        self._server = None
+        self._trigger_types = SNAPSHOT_TRIGGERS
+
+    @property
+    def pending(self) -> int:
+        """Number of images being fetched, queued or processed."""
+        return self._pending
+
+    def submit(self, image: bytes, crop: tuple = None, size: tuple = None, quality: int = None, source_size: tuple = None) -> asyncio.Future:
+        """Queue an image for processing and return a future for the result."""
+        if self._pending >= self._max_queue:
+            raise QueueFullError(f"Snapshot pipeline queue is full ({self._max_queue} images)")
+
+        self._pending += 1
+        future = self._run(image, crop, size, quality, source_size)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _run(self, image: bytes, crop: tuple, size: tuple, quality: int, source_size: tuple) -> asyncio.Future:
+        """Run `process_image` in the pool without counting it as pending."""
+        job = partial(
+            process_image,
+            image,
+            crop,
+            size if size is not None else self._size,
+            quality if quality is not None else self._quality,
+            source_size,
+        )
+        return asyncio.get_running_loop().run_in_executor(self._executor, job)
+
+    async def process(self, image: bytes, crop: tuple = None, size: tuple = None, quality: int = None, source_size: tuple = None) -> bytes:
+        """Process an image off the event loop and return the JPEG bytes."""
+        return await self.submit(image, crop, size, quality, source_size)
+
+    def _job_done(self, future) -> None:
+        self._pending -= 1
+
+    async def attach(self, server, events, trigger_types: list = SNAPSHOT_TRIGGERS) -> None:
+        """Process a snapshot for every motion event of `events`.
+
+        The snapshot is fetched with `server` and cropped to the latest
+        MOTION bounding box of the camera. Results are available through
+        `result`.
+        """
+        self._server = server
+        self._trigger_types = trigger_types
+        await events.registerCameraCallback(self._on_event)
+
+    def result(self, camera_id) -> asyncio.Future:
+        """Returns the future of the latest triggered job for a camera, or None."""
+        return self._results.get(int(camera_id))
+
+    def _on_event(self, camera_id, event_type, data) -> None:
+        if event_type not in self._trigger_types:
+            return
+        previous = self._results.get(camera_id)
+        if previous is not None and not previous.done():
+            return
+        if self._pending >= self._max_queue:
+            _LOGGER.debug("Snapshot pipeline full, skipping camera %s", camera_id)
+            return
+        crop = None
+        if self._crop_to_motion:
+            crop = (data["box_pos_x"], data["box_pos_y"], data["box_pos_w"], data["box_pos_h"])
+        # Hold the slot while the snapshot is fetched too, so events that
+        # arrive before the first image reaches the pool are still bounded.
+        self._pending += 1
+        task = asyncio.ensure_future(self._process_camera(camera_id, crop))
+        task.add_done_callback(self._job_done)
+        task.add_done_callback(self._log_failure)
+        self._results[camera_id] = task
+
+    def _log_failure(self, task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.debug("Snapshot pipeline job failed: %s", task.exception())
+
+    async def _process_camera(self, camera_id: int, crop: tuple) -> bytes:
+        image = await self._server.get_snapshot_image(camera_id)
+        source_size = None
+        device = self._server.devices.get(camera_id)
+        if device is not None:
+            source_size = (device["image_width"], device["image_height"])
+        try:
+            return await self._run(image, crop, None, None, source_size)
+        except Exception as err:
+            raise SecuritySpyError(f"Could not process snapshot from camera {camera_id}: {err}")
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,121 @@
+"""Latency and throughput metrics for the event stream."""
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# Smoothing factor of the moving averages.
+_ALPHA = 0.1
+
+_minutes = {}
+
+def parse_timestamp(value: str) -> float:
+    """Convert a 14 digit YYYYMMDDHHMMSS timestamp to epoch seconds.
+
+    SecuritySpy reports local time. The epoch of each minute is cached, so
+    most events only cost a dictionary lookup and an int conversion.
+    """
+    prefix = value[:12]
+    base = _minutes.get(prefix)
+    if base is None:
+        base = time.mktime((
+            int(value[0:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[8:10]),
+            int(value[10:12]),
+            0, 0, 0, -1,
+        ))
+        if len(_minutes) > 60:
+            _minutes.clear()
+        _minutes[prefix] = base
+    return base + int(value[12:14])
+
+class StreamMetrics:
+    """Measures how far behind real time the event stream is.
+
+    Lag is the time between the event timestamp and the moment the event
+    is dispatched to callbacks, so it includes time spent waiting in the
+    queue. Timestamps have one second resolution and depend on the
+    SecuritySpy server clock, so small lags are approximate. When replaying
+    a recording, lag is measured from the moment each line was read instead.
+    """
+
+    def __init__(self, lag_threshold: float = None):
+        self.lag_threshold = lag_threshold
+        self._alarm_callbacks = []
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        self.events_received = 0
+        self.events_dispatched = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.last_dispatch_time = 0.0
+        self.max_dispatch_time = 0.0
+        self.avg_dispatch_time = 0.0
+        self.lagging = False
+        self.started = time.monotonic()
+
+    def add_alarm_callback(self, callback) -> None:
+        """Call callback(camera_id, lag) when lag first exceeds the threshold."""
+        self._alarm_callbacks.append(callback)
+
+    def received(self, queue_depth: int) -> None:
+        """Record an event line read from the stream."""
+        self.events_received += 1
+        self.queue_depth = queue_depth
+        if queue_depth > self.max_queue_depth:
+            self.max_queue_depth = queue_depth
+
+    def dispatched(self, camera_id, lag: float, dispatch_time: float, queue_depth: int) -> None:
+        """Record an event that has been handed to the callbacks."""
+        self.events_dispatched += 1
+        self.queue_depth = queue_depth
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+        self.avg_lag += _ALPHA * (lag - self.avg_lag)
+        self.last_dispatch_time = dispatch_time
+        if dispatch_time > self.max_dispatch_time:
+            self.max_dispatch_time = dispatch_time
+        self.avg_dispatch_time += _ALPHA * (dispatch_time - self.avg_dispatch_time)
+
+        if self.lag_threshold is None:
+            return
+        if lag > self.lag_threshold:
+            if not self.lagging:
+                self.lagging = True
+                _LOGGER.warning("Event stream is %.1f seconds behind (threshold %s)", lag, self.lag_threshold)
+                for callback in self._alarm_callbacks:
+                    callback(camera_id, lag)
+        elif self.lagging:
+            self.lagging = False
+            _LOGGER.info("Event stream caught up, lag %.1f seconds", lag)
+
+    @property
+    def events_per_second(self) -> float:
+        """Average dispatch rate since the last reset."""
+        elapsed = time.monotonic() - self.started
+        return self.events_dispatched / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        """Return the metrics as a dictionary."""
+        return {
+            "events_received": self.events_received,
+            "events_dispatched": self.events_dispatched,
+            "events_per_second": self.events_per_second,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "avg_lag": self.avg_lag,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "last_dispatch_time": self.last_dispatch_time,
+            "max_dispatch_time": self.max_dispatch_time,
+            "avg_dispatch_time": self.avg_dispatch_time,
+            "lagging": self.lagging,
+        }
@@ -0,0 +1,332 @@
+"""Parsers for the ++systemInfo XML document.
+
+The document is parsed into plain dictionaries holding the text of the
+few elements the library uses, so the same parse result can feed server
+information, the camera list and the event stream bootstrap.
+
+Three backends are available:
+
+* etree: the standard library ElementTree.
+* lxml: the same tree walk using lxml, if it is installed.
+* scanner: a string scanner that only looks for the elements used.
+
+etree is the default. The scanner avoids building a tree and runs at
+about the speed of etree (see benchmarks/bench_parser.py). It returns
+what etree would for the elements used, or raises ResultError for markup
+it cannot read, but does not validate the rest of the document. The backend can be selected with `set_parser_backend` or the
+PYSECURITYSPY_XML_PARSER environment variable.
+"""
+import logging
+import os
+import re
+
+from pysecurityspy.const import (
+    PARSER_ETREE,
+    PARSER_LXML,
+    PARSER_SCANNER,
+    PARSER_BACKENDS,
+)
+from pysecurityspy.errors import ResultError
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVER_FIELDS = ("name", "version")
+
+CAMERA_FIELDS = (
+    "number",
+    "connected",
+    "name",
+    "width",
+    "height",
+    "mdsensitivity",
+    "devicename",
+    "devicetype",
+    "address",
+    "port",
+    "mode-c",
+    "mode-m",
+    "mode-a",
+)
+
+_backend = os.environ.get("PYSECURITYSPY_XML_PARSER", PARSER_ETREE)
+
+def set_parser_backend(backend: str) -> None:
+    """Select the backend used by `parse_system_info`."""
+    global _backend
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend}, use one of {PARSER_BACKENDS}")
+    _backend = backend
+
+def get_parser_backend() -> str:
+    """Returns the backend used by `parse_system_info`."""
+    return _backend
+
+def parse_system_info(document, backend: str = None) -> dict:
+    """Parse a ++systemInfo document.
+
+    Returns a dictionary with a `server` dictionary and a `cameras` list,
+    each keyed by element name. Missing elements are None.
+    """
+    backend = backend or get_parser_backend()
+    try:
+        if backend == PARSER_SCANNER:
+            return _parse_scanner(document)
+        if backend == PARSER_LXML:
+            from lxml import etree
+
+            if isinstance(document, str):
+                document = document.encode("utf-8")
+            # ElementTree drops comments and processing instructions, joining
+            # the text around them.
+            parser = etree.XMLParser(remove_comments=True, remove_pis=True)
+            return _parse_lxml(etree.fromstring(document, parser))
+        if backend == PARSER_ETREE:
+            import xml.etree.ElementTree as ET
+
+            return _parse_tree(ET.fromstring(document))
+    except ResultError:
+        raise
+    except Exception as err:
+        _LOGGER.debug("Error when parsing systemInfo: " + str(err))
+        raise ResultError(f"Could not parse systemInfo: {err}")
+    raise ValueError(f"Unknown parser backend {backend}")
+
+def _parse_tree(root) -> dict:
+    """Extract the fields from an ElementTree tree."""
+    server = {}
+    item = root.find("server")
+    for field in SERVER_FIELDS:
+        server[field] = item.findtext(field) if item is not None else None
+
+    cameras = []
+    for item in root.iterfind("cameralist/camera"):
+        cameras.append({field: item.findtext(field) for field in CAMERA_FIELDS})
+
+    return {"server": server, "cameras": cameras}
+
+def _children_text(item, fields) -> dict:
+    """Returns findtext results for `fields` in a single pass over the children."""
+    row = dict.fromkeys(fields)
+    for child in item.iterchildren():
+        tag = child.tag
+        if tag in row and row[tag] is None:
+            row[tag] = child.text or ""
+    return row
+
+def _parse_lxml(root) -> dict:
+    """Extract the fields from an lxml tree.
+
+    lxml evaluates findtext paths in Python, so walk the children once
+    instead of searching for every field.
+    """
+    item = root.find("server")
+    if item is not None:
+        server = _children_text(item, SERVER_FIELDS)
+    else:
+        server = dict.fromkeys(SERVER_FIELDS)
+
+    cameras = []
+    for item in root.iterfind("cameralist/camera"):
+        cameras.append(_children_text(item, CAMERA_FIELDS))
+
+    return {"server": server, "cameras": cameras}
+
+# Any start, end or empty element tag, with optional attributes.
+_TAG = re.compile(r"""<(/?)([A-Za-z_][\w.:-]*)((?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*)\s*(/?)>""")
+_TOKEN = re.compile(r"<!\[CDATA\[(.*?)\]\]>|<!--.*?-->|<\?.*?\?>|" + _TAG.pattern, re.S)
+_MARKUP = re.compile(r"<!\[CDATA\[.*?\]\]>|<!--.*?-->|<\?.*?\?>", re.S)
+# A child holding plain text, a camera start or end tag, or anything else.
+_CHILD = re.compile(
+    r"<([A-Za-z_][\w.:-]*)(?:>([^<]*)</\1>|/>)"
+    r"""|(<camera(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|'[^']*'))*\s*>)|(</camera>)|(\S)"""
+)
+_ENTITY = re.compile(r"&([^&;]*)(;?)")
+_ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+_SERVER_START = re.compile(r"<server[\s/>]")
+_CAMERALIST_START = re.compile(r"<cameralist[\s/>]")
+_CAMERA_START = re.compile(r"<camera[\s/>]")
+_ENCODING = re.compile(r"""<\?xml[^>]*encoding\s*=\s*["']([^"']*)["']""")
+
+def _parse_scanner(document) -> dict:
+    """Extract the fields by scanning for the element tags directly.
+
+    Only the server and camera elements are examined. Anything the
+    scanner cannot interpret exactly as ElementTree would, such as a
+    DOCTYPE or markup it does not expect, raises ResultError.
+    """
+    if isinstance(document, bytes):
+        match = _ENCODING.match(document[:200].decode("ascii", "replace"))
+        if match is not None and match.group(1).lower() not in ("utf-8", "utf8"):
+            raise ResultError(f"The scanner only reads UTF-8 systemInfo, not {match.group(1)}")
+        document = document.decode("utf-8")
+    if "<system" not in document:
+        raise ResultError("Document is not a systemInfo response")
+    if "<!DOCTYPE" in document:
+        raise ResultError("The scanner does not support a DOCTYPE in systemInfo")
+
+    server = dict.fromkeys(SERVER_FIELDS)
+    for match in _SERVER_START.finditer(document):
+        if _depth(document, match.start()) == 1:
+            server = _element(document, match.start(), "server", SERVER_FIELDS)[0]
+            break
+
+    cameras = []
+    for match in _CAMERALIST_START.finditer(document):
+        if _depth(document, match.start()) == 1:
+            _scan_cameras(document, match.start(), cameras)
+
+    return {"server": server, "cameras": cameras}
+
+def _depth(document: str, pos: int) -> int:
+    """Returns the element depth at `pos`, or -1 inside a comment or CDATA."""
+    prefix = document[:pos]
+    if "<!" in prefix or "<?" in prefix:
+        prefix = _MARKUP.sub("", prefix)
+        if "<!" in prefix or "<?" in prefix:
+            return -1
+    depth = 0
+    for closing, _, _, empty in _TAG.findall(prefix):
+        if closing:
+            depth -= 1
+        elif not empty:
+            depth += 1
+    return depth
+
+def _element(document: str, pos: int, name: str, fields) -> tuple:
+    """Returns the fields of the element starting at `pos` and where it ends."""
+    tag = _TAG.match(document, pos)
+    if tag is None or tag.group(1) or tag.group(2) != name:
+        raise ResultError(f"Malformed {name} element in systemInfo")
+    if tag.group(4):
+        return dict.fromkeys(fields), tag.end()
+    close_tag = f"</{name}>"
+    stop = document.find(close_tag, tag.end())
+    if stop == -1:
+        raise ResultError(f"Unterminated {name} element in systemInfo")
+    return _scan_fields(document[tag.end():stop], fields), stop + len(close_tag)
+
+def _scan_cameras(document: str, pos: int, cameras: list) -> None:
+    """Append the fields of every camera in the cameralist starting at `pos`.
+
+    A list of cameras whose children only hold text is read with a single
+    regular expression; anything else is read camera by camera.
+    """
+    tag = _TAG.match(document, pos)
+    if tag is None or tag.group(1) or tag.group(2) != "cameralist":
+        raise ResultError("Malformed cameralist element in systemInfo")
+    if tag.group(4):
+        return
+    end = document.find("</cameralist>", tag.end())
+    if end == -1:
+        raise ResultError("Unterminated cameralist element in systemInfo")
+
+    rows = []
+    row = None
+    for child, text, opening, closing, _ in _CHILD.findall(document, tag.end(), end):
+        if child:
+            if row is None:
+                # An empty camera; other children of the list are ignored.
+                if child == "camera":
+                    rows.append(dict.fromkeys(CAMERA_FIELDS))
+            elif child in row and row[child] is None:
+                row[child] = _text(text) if "&" in text or "\r" in text else text
+        elif opening and row is None:
+            row = dict.fromkeys(CAMERA_FIELDS)
+        elif closing and row is not None:
+            rows.append(row)
+            row = None
+        else:
+            return _walk_cameras(document, tag.end(), end, cameras)
+    if row is not None:
+        raise ResultError("Unterminated camera element in systemInfo")
+    cameras.extend(rows)
+
+def _walk_cameras(document: str, pos: int, end: int, cameras: list) -> None:
+    """Append the fields of every camera between `pos` and `end`, one by one."""
+    while True:
+        match = _CAMERA_START.search(document, pos, end)
+        stop = match.start() if match is not None else end
+        gap = document[pos:stop]
+        if "<" in gap and "<" in _MARKUP.sub("", gap):
+            raise ResultError("Unexpected markup in cameralist of systemInfo")
+        if match is None:
+            return
+        row, pos = _element(document, match.start(), "camera", CAMERA_FIELDS)
+        if pos > end:
+            raise ResultError("Unterminated camera element in systemInfo")
+        cameras.append(row)
+
+def _scan_fields(block: str, fields) -> dict:
+    """Returns findtext results for `fields` among the children of an element."""
+    row = dict.fromkeys(fields)
+    for child, text, *_ in _CHILD.findall(block):
+        if not child:
+            return _walk_fields(block, fields)
+        if child in row and row[child] is None:
+            row[child] = _text(text) if "&" in text or "\r" in text else text
+    return row
+
+def _walk_fields(block: str, fields) -> dict:
+    """Returns findtext results for `fields`, following nested elements."""
+    row = dict.fromkeys(fields)
+    stack = []
+    field = None
+    text = None
+    pos = 0
+    for match in _TOKEN.finditer(block):
+        between = block[pos:match.start()]
+        if "<" in between:
+            raise ResultError("Unsupported markup in systemInfo")
+        pos = match.end()
+        if text is not None and between:
+            text.append(_text(between))
+        cdata, closing, tag, _, empty = match.groups()
+        if cdata is not None:
+            if text is not None:
+                text.append(_newlines(cdata))
+            continue
+        if tag is None:
+            # Comments and processing instructions are not part of the text.
+            continue
+        if text is not None:
+            # findtext stops at the first child element.
+            row[field] = "".join(text)
+            text = None
+        if closing:
+            if not stack or stack.pop() != tag:
+                raise ResultError(f"Mismatched {tag} element in systemInfo")
+        elif not stack:
+            if tag in row and row[tag] is None:
+                row[tag] = ""
+                if not empty:
+                    field = tag
+                    text = []
+            if not empty:
+                stack.append(tag)
+        elif not empty:
+            stack.append(tag)
+    if stack or "<" in block[pos:]:
+        raise ResultError("Unterminated element in systemInfo")
+    return row
+
+def _newlines(value: str) -> str:
+    """Normalise line endings as an XML parser does."""
+    if "\r" in value:
+        value = value.replace("\r\n", "\n").replace("\r", "\n")
+    return value
+
+def _text(value: str) -> str:
+    """Returns the text of character data, resolving entity references."""
+    value = _newlines(value)
+    return _ENTITY.sub(_entity, value) if "&" in value else value
+
+def _entity(match) -> str:
+    name, semicolon = match.groups()
+    if semicolon:
+        if name in _ENTITIES:
+            return _ENTITIES[name]
+        if name.startswith("#x"):
+            return chr(int(name[2:], 16))
+        if name.startswith("#") and name[1:].isdigit():
+            return chr(int(name[1:]))
+    raise ResultError(f"Unsupported entity &{name}{semicolon} in systemInfo")
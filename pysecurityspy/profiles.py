@@ -0,0 +1,29 @@
+"""Stream profiles derived from the camera resolution."""
+from functools import lru_cache
+
+from pysecurityspy.const import (
+    DEFAULT_IMAGE_WIDTH,
+    DEFAULT_IMAGE_HEIGHT,
+    STREAM_PROFILES,
+)
+
+@lru_cache(maxsize=64)
+def profile_sizes(width: int, height: int) -> tuple:
+    """Returns (profile, width, height, fps) for each profile of a resolution.
+
+    Sizes keep the aspect ratio of the camera, are never larger than the
+    camera resolution and are rounded to even numbers as most encoders
+    require. Unknown resolutions fall back to 1920x1080.
+    """
+    if not width or not height:
+        width, height = DEFAULT_IMAGE_WIDTH, DEFAULT_IMAGE_HEIGHT
+    sizes = []
+    for profile, (max_width, fps) in STREAM_PROFILES.items():
+        scale = 1.0 if max_width is None else min(1.0, max_width / width)
+        sizes.append((
+            profile,
+            max(2, int(round(width * scale / 2)) * 2),
+            max(2, int(round(height * scale / 2)) * 2),
+            fps,
+        ))
+    return tuple(sizes)
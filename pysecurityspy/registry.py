@@ -0,0 +1,117 @@
+"""Camera registry shared between the server and event clients."""
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+_REGISTRIES = {}
+
+def get_registry(base: str, host: str, port: int, auth: str) -> "CameraRegistry":
+    """Returns the registry shared by clients of a server with the same login.
+
+    `auth` is the encoded username and password of the client. Clients
+    using another scheme, username or password get their own registry, so
+    a client can never bootstrap from data fetched with other credentials.
+    """
+    key = (base, host, int(port), auth)
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        registry = CameraRegistry()
+        _REGISTRIES[key] = registry
+    return registry
+
+class CameraRegistry:
+    """Holds the most recent parsed ++systemInfo document.
+
+    Every update bumps `generation`, so readers can tell whether the data
+    changed since they last looked. Callers that accept cached data (the
+    event bootstrap and server information) reuse a refresh in flight
+    instead of making their own request; `SecuritySpyServer.update` always
+    fetches.
+    """
+
+    def __init__(self):
+        self._system_info = None
+        self._generation = 0
+        self._updated = 0.0
+        self._refreshing = None
+
+    @property
+    def generation(self) -> int:
+        """Number of updates applied, 0 if never filled."""
+        return self._generation
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last update."""
+        if self._system_info is None:
+            return float("inf")
+        return time.monotonic() - self._updated
+
+    @property
+    def system_info(self) -> dict:
+        """The parsed systemInfo document, or None."""
+        return self._system_info
+
+    @property
+    def server(self) -> dict:
+        """Server name and version."""
+        if self._system_info is None:
+            return {}
+        return self._system_info["server"]
+
+    @property
+    def cameras(self) -> list:
+        """Cameras of the last parsed document."""
+        if self._system_info is None:
+            return []
+        return self._system_info["cameras"]
+
+    def camera(self, camera_id) -> dict:
+        """Returns the parsed fields of a single camera, or None."""
+        for item in self.cameras:
+            if item["number"] == str(camera_id):
+                return item
+        return None
+
+    def update(self, system_info: dict) -> int:
+        """Store a freshly parsed document and return the new generation."""
+        self._system_info = system_info
+        self._updated = time.monotonic()
+        self._generation += 1
+        return self._generation
+
+    async def async_get(self, fetch, max_age: float = None) -> dict:
+        """Returns the parsed document, calling `fetch` if it is stale.
+
+        `fetch` is a coroutine function returning a parsed document. With
+        `max_age` None the caller always makes its own request. Otherwise
+        the cached document is returned while it is younger than
+        `max_age`, and a refresh already in flight is shared.
+        """
+        if max_age is None:
+            return await self._refresh(fetch)
+        if self.age <= max_age:
+            return self._system_info
+        # A refresh started in another event loop cannot be awaited here.
+        refreshing = self._refreshing
+        if (
+            refreshing is not None
+            and not refreshing.done()
+            and refreshing.get_loop() is asyncio.get_running_loop()
+        ):
+            return await asyncio.shield(refreshing)
+        return await self._refresh(fetch)
+
+    async def _refresh(self, fetch) -> dict:
+        """Run `fetch` as the refresh other `max_age` callers may join."""
+        task = asyncio.ensure_future(self._fetch_and_update(fetch))
+        self._refreshing = task
+        return await asyncio.shield(task)
+
+    async def _fetch_and_update(self, fetch) -> dict:
+        system_info = await fetch()
+        self.update(system_info)
+        _LOGGER.debug("Camera registry refreshed, generation %s", self._generation)
+        return system_info
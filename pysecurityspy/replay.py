@@ -0,0 +1,102 @@
+"""Record and replay the raw ++eventStream.
+
+A recording holds every line read from the stream together with the
+time it arrived, so a burst can be fed to `SecuritySpyEvents` again
+offline at its original pace, faster, or as fast as possible.
+
+File layout: the MAGIC header, then for each line a little endian
+(double seconds since start, uint32 length) record header followed by
+the raw bytes.
+"""
+import asyncio
+import logging
+import struct
+import time
+
+from pysecurityspy.errors import ResultError
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"PYSECURITYSPY-EVENTS-1\n"
+
+_RECORD = struct.Struct("<dI")
+
+class StreamRecorder:
+    """Writes stream lines with their arrival time to a file."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._started = time.monotonic()
+        self.lines = 0
+
+    def write(self, line: bytes) -> None:
+        """Append a line to the recording.
+
+        Every line is flushed, so a capture survives the process crashing
+        during the burst it was meant to record.
+        """
+        self._file.write(_RECORD.pack(time.monotonic() - self._started, len(line)))
+        self._file.write(line)
+        self._file.flush()
+        self.lines += 1
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+async def record_stream(stream, recorder: StreamRecorder):
+    """Yield the lines of `stream`, writing each one to `recorder`."""
+    async for line in stream:
+        recorder.write(line)
+        yield line
+
+def read_recording(path: str):
+    """Returns the (offset, line) records of a recording."""
+    with open(path, "rb") as rec_file:
+        data = rec_file.read()
+    if not data.startswith(MAGIC):
+        raise ResultError(f"{path} is not an event stream recording")
+
+    records = []
+    pos = len(MAGIC)
+    while pos < len(data):
+        if pos + _RECORD.size > len(data):
+            raise ResultError(f"Truncated record header in {path}")
+        offset, length = _RECORD.unpack_from(data, pos)
+        pos += _RECORD.size
+        if pos + length > len(data):
+            raise ResultError(f"Truncated record in {path}")
+        records.append((offset, data[pos:pos + length]))
+        pos += length
+    return records
+
+class ReplayStream:
+    """Async iterator over the lines of a recording.
+
+    `speed` 1.0 keeps the original timing, 10.0 plays ten times faster
+    and 0 replays as fast as possible. The recording is read into memory
+    up front so disk access does not distort the timing.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self._records = read_recording(path)
+        self._speed = speed
+
+    def __len__(self):
+        return len(self._records)
+
+    async def __aiter__(self):
+        started = time.monotonic()
+        for offset, line in self._records:
+            if self._speed:
+                delay = started + offset / self._speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield line
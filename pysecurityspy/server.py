@@ -2,15 +2,25 @@
 import logging
 import asyncio
 import sys
-import xml.etree.ElementTree as ET
+import time
 
 from typing import Optional
 from aiohttp import ClientSession, ClientTimeout
-from aiohttp.client_exceptions import ClientError
+from aiohttp.client_exceptions import ClientConnectionError, ClientError
 from base64 import b64encode
 
 from pysecurityspy.const import (
     DEFAULT_TIMEOUT,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    CIRCUIT_SERVER,
+    PREFETCH_MIN_INTERVAL,
+    PREFETCH_MAX_AGE,
+    REGISTRY_MAX_AGE,
+    SNAPSHOT_TRIGGERS,
+    STREAM_PROFILE_MAIN,
+    STREAM_PROFILE_SUB,
+    STREAM_PROFILES,
     RECORDING_MODE_ALWAYS,
     RECORDING_MODE_MOTION,
     RECORDING_MODE_ACTION,
@@ -24,10 +34,15 @@ from pysecurityspy.const import (
     EVENT_TYPE_FILE,
 )
 from pysecurityspy.errors import (
+    CircuitOpenError,
     InvalidCredentials,
     RequestError,
     ResultError,
 )
+from pysecurityspy.circuit import CircuitBreaker
+from pysecurityspy.parser import parse_system_info
+from pysecurityspy.profiles import profile_sizes
+from pysecurityspy.registry import CameraRegistry, get_registry
 from pysecurityspy.dataclasses import (
     CameraData,
     RecordingSettings,
@@ -46,6 +61,9 @@ class SecuritySpyServer:
         password: str,
         use_ssl: bool = False,
         session: Optional[ClientSession] = None,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        registry: Optional[CameraRegistry] = None,
     ):
         self._host = host
         self._port = port
@@ -56,12 +74,50 @@ class SecuritySpyServer:
         self._base = "http" if not use_ssl else "https"
         self.device_data = {}
         self.event_data = {}
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._circuits = {}
+        self._registry = registry or get_registry(self._base, host, port, self._auth)
+        self._generation = 0
+        self._prefetch = False
+        self._prefetch_min_interval = PREFETCH_MIN_INTERVAL
+        self._prefetch_max_age = PREFETCH_MAX_AGE
+        self._prefetch_tasks = {}
+        self._prefetch_requested = {}
+        self._snapshot_cache = {}
 
     @property
     def devices(self):
         """ Returns a JSON formatted list of Devices. """
         return self.device_data
 
+    @property
+    def registry(self) -> CameraRegistry:
+        """Returns the camera registry shared with the event client."""
+        return self._registry
+
+    @property
+    def health(self) -> dict:
+        """Returns the circuit state of the server and each camera."""
+        return {key: circuit.as_dict() for key, circuit in self._circuits.items()}
+
+    @property
+    def is_available(self) -> bool:
+        """Returns False while requests to the server are failing fast."""
+        return self._get_circuit(CIRCUIT_SERVER).healthy
+
+    def camera_available(self, camera_id) -> bool:
+        """Returns False while requests to a camera are failing fast."""
+        return self._get_circuit(int(camera_id)).healthy
+
+    def _get_circuit(self, key) -> CircuitBreaker:
+        """Returns the circuit breaker for the server or a camera."""
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = CircuitBreaker(key, self._failure_threshold, self._reset_timeout)
+            self._circuits[key] = circuit
+        return circuit
+
     async def update(self) -> dict:
         """Returns the updated data."""
         await self._get_camera_list()
@@ -70,66 +126,75 @@ class SecuritySpyServer:
     
     async def get_server_information(self) -> None:
         """Return information about the SecuritySpy Server."""
-        endpoint = f"{self._base}://{self._host}:{self._port}/++systemInfo&auth={self._auth}"
-        _LOGGER.debug(endpoint)
-        response = await self.async_request("get", endpoint)
-
-        data = ET.fromstring(response)
-        for item in data.iterfind('server'):
-            try:
-                row = {
-                    "name": item.findtext("name"),
-                    "version": item.findtext("version"),
-                    "host": self._host
-                }
-                return row
-                
-            except BaseException as e:
-                _LOGGER.debug("Error when retrieving Server Data: " + str(e))
-                raise ResultError
+        system_info = await self._async_system_info(REGISTRY_MAX_AGE)
+        return self._server_info(system_info)
 
     async def _get_camera_list(self) -> None:
         """Returns a list of the attached Cameras."""
+        await self._async_system_info()
+
+    async def _async_system_info(self, max_age: float = None) -> dict:
+        """Returns systemInfo from the shared registry, updating camera data."""
+        system_info = await self._registry.async_get(self._fetch_system_info, max_age)
+        if self._generation != self._registry.generation:
+            self._update_cameras(system_info["cameras"])
+            self._generation = self._registry.generation
+        return system_info
+
+    async def _fetch_system_info(self) -> dict:
+        """Fetch and parse ++systemInfo."""
         endpoint = f"{self._base}://{self._host}:{self._port}/++systemInfo&auth={self._auth}"
+        _LOGGER.debug(endpoint)
         response = await self.async_request("get", endpoint)
+        return parse_system_info(response)
 
-        cameras = ET.fromstring(response)
-        for item in cameras.iterfind('cameralist/camera'):
+    def _server_info(self, system_info: dict) -> dict:
+        """Returns the server details from a parsed systemInfo document."""
+        return {
+            "name": system_info["server"]["name"],
+            "version": system_info["server"]["version"],
+            "host": self._host
+        }
+
+    def _update_cameras(self, cameras: list) -> None:
+        """Update device data from the cameras of a parsed systemInfo document."""
+        for item in cameras:
             try:
-                uid = int(item.findtext("number"))
-                if item.findtext("connected") == "yes":
+                uid = int(item["number"])
+                if item["connected"] == "yes":
                     online = True
                 else:
                     online = False
-                mode_c = item.findtext("mode-c")
-                mode_m = item.findtext("mode-m")
+                mode_c = item["mode-c"]
+                mode_m = item["mode-m"]
                 recording_mode = RECORDING_MODE_NEVER
                 if mode_c == MODE_ARMED:
                     recording_mode = RECORDING_MODE_ALWAYS
                 elif mode_m == MODE_ARMED:
                     recording_mode = RECORDING_MODE_MOTION
-                rtsp_video = f"rtsp://{self._username}:{self._password}@{self._host}:{self._port}/++stream?cameraNum={uid}&width=1920&height=1080&req_fps=15"
-                still_image = f"{self._base}://{self._host}:{self._port}/++image?cameraNum={uid}&width=1920&height=1080&quality=1&auth={self._auth}"
+                image_width = int(item["width"] or 0)
+                image_height = int(item["height"] or 0)
 
-                cams = [camera for camera in self.device_data]
-                if uid not in cams:
+                if uid not in self.device_data:
+                    stream_profiles = self._stream_profiles(uid, image_width, image_height)
                     item = {
                         uid: {
                             "online": online,
-                            "name": item.findtext("name"),
-                            "image_width": int(item.findtext("width")),
-                            "image_height": int(item.findtext("height")),
-                            "mdsensitivity": int(item.findtext("mdsensitivity")),
-                            "camera_model": item.findtext("devicename"),
-                            "camera_type": item.findtext("devicetype"),
-                            "address": item.findtext("address"),
-                            "port": item.findtext("port"),
+                            "name": item["name"],
+                            "image_width": image_width,
+                            "image_height": image_height,
+                            "mdsensitivity": int(item["mdsensitivity"]),
+                            "camera_model": item["devicename"],
+                            "camera_type": item["devicetype"],
+                            "address": item["address"],
+                            "port": item["port"],
                             "mode_c": mode_c,
                             "mode_m": mode_m,
-                            "mode_a": item.findtext("mode-a"),
+                            "mode_a": item["mode-a"],
                             "recording_mode": recording_mode,
-                            "rtsp_video": rtsp_video,
-                            "still_image": still_image,
+                            "rtsp_video": stream_profiles[STREAM_PROFILE_MAIN]["rtsp_video"],
+                            "still_image": stream_profiles[STREAM_PROFILE_MAIN]["still_image"],
+                            "stream_profiles": stream_profiles,
                             "is_motion": False,
                         }
                     }
@@ -139,18 +204,112 @@ class SecuritySpyServer:
                     self.device_data[uid]["online"] = online
                     self.device_data[uid]["mode_c"] = mode_c
                     self.device_data[uid]["mode_m"] = mode_m
-                    self.device_data[uid]["mode_a"] = item.findtext("mode-a")
+                    self.device_data[uid]["mode_a"] = item["mode-a"]
+                    device = self.device_data[uid]
+                    if (device["image_width"], device["image_height"]) != (image_width, image_height):
+                        stream_profiles = self._stream_profiles(uid, image_width, image_height)
+                        device["image_width"] = image_width
+                        device["image_height"] = image_height
+                        device["rtsp_video"] = stream_profiles[STREAM_PROFILE_MAIN]["rtsp_video"]
+                        device["still_image"] = stream_profiles[STREAM_PROFILE_MAIN]["still_image"]
+                        device["stream_profiles"] = stream_profiles
 
             except BaseException as e:
                 _LOGGER.debug("Error when retrieving Camera Data: " + str(e))
                 raise ResultError
 
-    async def get_snapshot_image(self, camera_id):
+    def _stream_profiles(self, uid: int, width: int, height: int) -> dict:
+        """Returns the stream and still image addresses of each profile."""
+        stream_profiles = {}
+        for profile, profile_width, profile_height, fps in profile_sizes(width, height):
+            stream_profiles[profile] = {
+                "width": profile_width,
+                "height": profile_height,
+                "fps": fps,
+                "rtsp_video": f"rtsp://{self._username}:{self._password}@{self._host}:{self._port}/++stream?cameraNum={uid}&width={profile_width}&height={profile_height}&req_fps={fps}",
+                "still_image": f"{self._base}://{self._host}:{self._port}/++image?cameraNum={uid}&width={profile_width}&height={profile_height}&quality=1&auth={self._auth}",
+            }
+        return stream_profiles
+
+    def _camera_profile(self, camera_id: int, profile: str) -> dict:
+        """Returns a stream profile of a camera, using 1920x1080 if the camera is unknown."""
+        if profile not in STREAM_PROFILES:
+            raise ValueError(f"Unknown stream profile {profile}, use one of {list(STREAM_PROFILES)}")
+        device = self.device_data.get(camera_id)
+        if device is not None:
+            return device["stream_profiles"][profile]
+        return self._stream_profiles(camera_id, 0, 0)[profile]
+
+    def get_stream_url(self, camera_id, profile: str = STREAM_PROFILE_SUB) -> str:
+        """Returns the RTSP address of a camera stream profile.
+
+        Use the sub or thumbnail profile for grid views to save server
+        CPU and network bandwidth.
+        """
+        return self._camera_profile(int(camera_id), profile)["rtsp_video"]
+
+    async def get_snapshot_image(self, camera_id, profile: str = STREAM_PROFILE_MAIN):
         """ Returns a Snapshot image from a Camera. """
-        endpoint = f"{self._base}://{self._host}:{self._port}/++image?cameraNum={camera_id}&width=1920&height=1080&quality=1&auth={self._auth}"
-        response = await self.async_request("get", endpoint, True)
+        camera_id = int(camera_id)
+        if self._prefetch and profile == STREAM_PROFILE_MAIN:
+            cached = self._snapshot_cache.get(camera_id)
+            if cached is not None and time.monotonic() - cached[0] <= self._prefetch_max_age:
+                return cached[1]
+            task = self._prefetch_tasks.get(camera_id)
+            if task is not None and not task.done():
+                return await asyncio.shield(task)
+        return await self._fetch_snapshot_image(camera_id, profile)
+
+    async def _fetch_snapshot_image(self, camera_id, profile: str = STREAM_PROFILE_MAIN):
+        """Request a Snapshot image from a Camera."""
+        endpoint = self._camera_profile(int(camera_id), profile)["still_image"]
+        response = await self.async_request("get", endpoint, True, int(camera_id))
         return response
 
+    async def enable_snapshot_prefetch(
+        self,
+        events,
+        min_interval: float = PREFETCH_MIN_INTERVAL,
+        max_age: float = PREFETCH_MAX_AGE,
+    ) -> None:
+        """Pre-fetch snapshots when `events` reports motion on a camera.
+
+        A camera is fetched at most once every `min_interval` seconds, and
+        `get_snapshot_image` returns the cached image while it is younger
+        than `max_age` seconds.
+        """
+        self._prefetch_min_interval = min_interval
+        self._prefetch_max_age = max_age
+        if not self._prefetch:
+            self._prefetch = True
+            await events.registerCameraCallback(self._on_motion_event)
+
+    def _on_motion_event(self, camera_id, event_type, data) -> None:
+        """Schedule a snapshot pre-fetch for motion events."""
+        if not self._prefetch or event_type not in SNAPSHOT_TRIGGERS:
+            return
+        now = time.monotonic()
+        if now - self._prefetch_requested.get(camera_id, -self._prefetch_min_interval) < self._prefetch_min_interval:
+            return
+        task = self._prefetch_tasks.get(camera_id)
+        if task is not None and not task.done():
+            return
+        self._prefetch_requested[camera_id] = now
+        task = asyncio.ensure_future(self._prefetch_snapshot(camera_id))
+        # Failures are logged in _prefetch_snapshot; mark them as retrieved.
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._prefetch_tasks[camera_id] = task
+
+    async def _prefetch_snapshot(self, camera_id):
+        """Fetch and cache a snapshot for a camera."""
+        try:
+            image = await self._fetch_snapshot_image(camera_id)
+        except RequestError as err:
+            _LOGGER.debug("Snapshot pre-fetch failed for camera %s: %s", camera_id, err)
+            raise
+        self._snapshot_cache[camera_id] = (time.monotonic(), image)
+        return image
+
     async def set_recording_mode(self, camera_id, new_mode):
         """Sets the recording mode for a specific camera."""
         if new_mode == RECORDING_MODE_MOTION:
@@ -167,7 +326,7 @@ class SecuritySpyServer:
             capturemode = "CM"
 
         endpoint = f"{self._base}://{self._host}:{self._port}/++setSchedule?cameraNum={camera_id}&schedule={schedule}&mode={capturemode}&override=0&auth={self._auth}"
-        response = await self.async_request("get", endpoint, False)
+        response = await self.async_request("get", endpoint, False, int(camera_id))
         if response == "OK":
             return new_mode
         else:
@@ -176,7 +335,7 @@ class SecuritySpyServer:
     async def get_recording_mode(self, camera_id):
         """Returns recording mode for a specific camera."""
         endpoint = f"{self._base}://{self._host}:{self._port}/++cameramodes?cameraNum={camera_id}"
-        response = await self.async_request("get", endpoint, False)
+        response = await self.async_request("get", endpoint, False, int(camera_id))
         
         items = []
         for line in response.split("\n"):
@@ -199,9 +358,49 @@ class SecuritySpyServer:
         )
         return items
 
-    async def async_request(self, method: str, endpoint: str, rawdata: bool = False) -> dict:
+    async def async_request(self, method: str, endpoint: str, rawdata: bool = False, circuit_key = CIRCUIT_SERVER) -> dict:
         """Make a request against the SmartWeather API."""
 
+        server = self._get_circuit(CIRCUIT_SERVER)
+        server_probe = False
+        # While the server circuit is not closed camera requests go through
+        # it too, so only a single probe reaches an unresponsive server.
+        if circuit_key != CIRCUIT_SERVER and not server.healthy:
+            if not server.allow_request():
+                raise CircuitOpenError(f"Circuit open for server, not requesting {endpoint}")
+            server_probe = True
+
+        circuit = self._get_circuit(circuit_key)
+        if not circuit.allow_request():
+            if server_probe:
+                server.release_probe()
+            raise CircuitOpenError(f"Circuit open for {circuit_key}, not requesting {endpoint}")
+        probe = circuit.probing
+
+        try:
+            data = await self._async_request(method, endpoint, rawdata)
+        except RequestError as err:
+            circuit.record_failure(err)
+            # A camera request that cannot reach the server at all says the
+            # server is down; HTTP errors only concern that camera.
+            if circuit_key != CIRCUIT_SERVER and isinstance(err.__cause__, (asyncio.TimeoutError, ClientConnectionError)):
+                server.record_failure(err)
+            raise
+        finally:
+            # A cancelled request says nothing about the server or camera,
+            # but a probe still held must be given back for the next try.
+            if probe and circuit.probing:
+                circuit.release_probe()
+            if server_probe and server.probing:
+                server.release_probe()
+        circuit.record_success()
+        if circuit_key != CIRCUIT_SERVER:
+            server.record_success()
+        return data
+
+    async def _async_request(self, method: str, endpoint: str, rawdata: bool = False) -> dict:
+        """Send a single request without circuit tracking."""
+
         use_running_session = self._session and not self._session.closed
 
         if use_running_session:
@@ -220,10 +419,12 @@ class SecuritySpyServer:
                     return decoded_content
                 else:
                     return data
-        except asyncio.TimeoutError:
-            raise RequestError("Request to endpoint timed out: {endpoint}")
+        except asyncio.TimeoutError as err:
+            raise RequestError("Request to endpoint timed out: {endpoint}") from err
         except ClientError as err:
-            raise RequestError(f"Error requesting data from {endpoint}: {err}")
+            raise RequestError(f"Error requesting data from {endpoint}: {err}") from err
+        except asyncio.CancelledError:
+            raise
         except:
             raise RequestError(f"Error occurred: {sys.exc_info()[1]}")
         finally:
@@ -0,0 +1,252 @@
+"""Camera state published to shared memory for other processes.
+
+One process owns the SecuritySpy connections and publishes with
+`SharedStateWriter`; any number of processes on the same host read with
+`SharedStateReader` without network or IPC round trips.
+
+The block is a fixed layout table: a header followed by one slot per
+camera. Each slot is guarded by a sequence counter (a seqlock): the
+writer makes it odd before changing the slot and even afterwards, and a
+reader retries when the counter was odd or changed while it was reading.
+"""
+import logging
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from pysecurityspy.const import (
+    RECORDING_MODES,
+    SHARED_STATE_NAME,
+    SHARED_STATE_MAX_CAMERAS,
+)
+from pysecurityspy.errors import ResultError
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"PYSSPY01"
+
+# magic, max cameras, cameras in use
+_HEADER = struct.Struct("<8sII")
+_SEQ = struct.Struct("<I")
+# uid, flags, recording mode, timestamp, event type, trigger type,
+# classify score, classify type, box x, y, w, h, published at, name
+_BODY = struct.Struct("<iBB14s16sIi16siiiid64s")
+_SLOT_SIZE = _SEQ.size + _BODY.size
+
+_FLAG_ONLINE = 1
+_FLAG_MOTION = 2
+_NO_MODE = 255
+_SPIN = 64
+_SETTLE_TIMEOUT = 1.0
+
+# Serialises attaching untracked with creating tracked blocks, as
+# attaching briefly disables resource tracker registration.
+_TRACKER_LOCK = threading.Lock()
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without registering it for cleanup.
+
+    The resource tracker is shared with the writer when reading from the
+    same process or a multiprocessing child, and it keeps one entry per
+    name, so a reader must neither register nor unregister the block:
+    that would remove the writer's entry and the block would leak if the
+    writer crashed.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    # Python < 3.13 always registers attached blocks.
+    from multiprocessing import resource_tracker
+
+    with _TRACKER_LOCK:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name)
+        finally:
+            resource_tracker.register = register
+
+def _encode(value, size: int) -> bytes:
+    """Encode a string to at most `size` bytes without splitting characters."""
+    if value is None:
+        return b""
+    data = str(value).encode("utf-8")[:size]
+    return data.decode("utf-8", "ignore").encode("utf-8")
+
+def _decode(value: bytes) -> str:
+    value = value.rstrip(b"\0")
+    return value.decode("utf-8", "ignore") if value else None
+
+class SharedStateWriter:
+    """Creates the shared memory block and publishes camera state into it."""
+
+    def __init__(self, name: str = SHARED_STATE_NAME, max_cameras: int = SHARED_STATE_MAX_CAMERAS):
+        with _TRACKER_LOCK:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=_HEADER.size + max_cameras * _SLOT_SIZE)
+        self._buf = self._shm.buf
+        self._max_cameras = max_cameras
+        self._slots = {}
+        self._state = {}
+        _HEADER.pack_into(self._buf, 0, MAGIC, max_cameras, 0)
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory block."""
+        return self._shm.name
+
+    async def attach(self, events) -> None:
+        """Publish every event received by a SecuritySpyEvents client."""
+        await events.registerCameraCallback(self._on_event)
+
+    def _on_event(self, camera_id, event_type, data) -> None:
+        self.publish(camera_id, event=data)
+
+    def publish_devices(self, devices: dict) -> None:
+        """Publish the device data of a SecuritySpyServer, e.g. after update()."""
+        for uid, device in devices.items():
+            self.publish(uid, device=device)
+
+    def publish(self, uid: int, device: dict = None, event: dict = None) -> None:
+        """Update the slot of a camera from device and/or event data."""
+        uid = int(uid)
+        state = self._state.get(uid)
+        if state is None:
+            if len(self._slots) >= self._max_cameras:
+                _LOGGER.warning("Shared state is full, not publishing camera %s", uid)
+                return
+            state = self._state[uid] = {"online": False, "recording_mode": None, "name": None}
+        if device is not None:
+            state["online"] = device["online"]
+            state["recording_mode"] = device["recording_mode"]
+            state["name"] = device["name"]
+        if event is not None:
+            state["event"] = event
+            if state["name"] is None:
+                state["name"] = event.get("name")
+
+        event = state.get("event") or {}
+        flags = 0
+        if state["online"]:
+            flags |= _FLAG_ONLINE
+        if event.get("is_motion"):
+            flags |= _FLAG_MOTION
+        mode = state["recording_mode"]
+        body = (
+            uid,
+            flags,
+            RECORDING_MODES.index(mode) if mode in RECORDING_MODES else _NO_MODE,
+            _encode(event.get("timestamp"), 14),
+            _encode(event.get("event_type") or None, 16),
+            event.get("trigger_type", 0),
+            event.get("classify_score", 0),
+            _encode(event.get("classify_type"), 16),
+            event.get("box_pos_x", 0),
+            event.get("box_pos_y", 0),
+            event.get("box_pos_w", 0),
+            event.get("box_pos_h", 0),
+            time.time(),
+            _encode(state["name"], 64),
+        )
+
+        slot = self._slots.get(uid)
+        new_slot = slot is None
+        if new_slot:
+            slot = len(self._slots)
+            self._slots[uid] = slot
+        offset = _HEADER.size + slot * _SLOT_SIZE
+        seq = _SEQ.unpack_from(self._buf, offset)[0]
+        _SEQ.pack_into(self._buf, offset, (seq + 1) & 0xFFFFFFFF)
+        _BODY.pack_into(self._buf, offset + _SEQ.size, *body)
+        _SEQ.pack_into(self._buf, offset, (seq + 2) & 0xFFFFFFFF)
+        if new_slot:
+            _HEADER.pack_into(self._buf, 0, MAGIC, self._max_cameras, len(self._slots))
+
+    def close(self, unlink: bool = True) -> None:
+        """Release the block, removing it unless `unlink` is False."""
+        self._buf = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+class SharedStateReader:
+    """Reads camera state published by a SharedStateWriter."""
+
+    def __init__(self, name: str = SHARED_STATE_NAME):
+        self._shm = _attach_untracked(name)
+        self._buf = self._shm.buf
+        magic, self._max_cameras, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ResultError(f"Shared memory block {name} was not created by SharedStateWriter")
+        self._slots = {}
+
+    def _in_use(self) -> int:
+        return _HEADER.unpack_from(self._buf, 0)[2]
+
+    def _read_slot(self, slot: int) -> tuple:
+        """Returns the body of a slot, retrying while it is being written."""
+        offset = _HEADER.size + slot * _SLOT_SIZE
+        deadline = None
+        while True:
+            for _ in range(_SPIN):
+                seq = _SEQ.unpack_from(self._buf, offset)[0]
+                if seq & 1:
+                    continue
+                body = _BODY.unpack_from(self._buf, offset + _SEQ.size)
+                if _SEQ.unpack_from(self._buf, offset)[0] == seq:
+                    return body
+            # The writer may have been preempted mid-update; yield to it.
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + _SETTLE_TIMEOUT
+            elif now > deadline:
+                raise ResultError(f"Shared state slot {slot} did not settle")
+            time.sleep(0)
+
+    def _row(self, body: tuple) -> dict:
+        mode = body[2]
+        return {
+            "uid": body[0],
+            "online": bool(body[1] & _FLAG_ONLINE),
+            "is_motion": bool(body[1] & _FLAG_MOTION),
+            "recording_mode": RECORDING_MODES[mode] if mode < len(RECORDING_MODES) else None,
+            "timestamp": _decode(body[3]),
+            "event_type": _decode(body[4]),
+            "trigger_type": body[5],
+            "classify_score": body[6],
+            "classify_type": _decode(body[7]),
+            "box_pos_x": body[8],
+            "box_pos_y": body[9],
+            "box_pos_w": body[10],
+            "box_pos_h": body[11],
+            "updated": body[12],
+            "name": _decode(body[13]),
+        }
+
+    def read(self, uid: int) -> dict:
+        """Returns the state of a camera, or None if it was never published."""
+        uid = int(uid)
+        slot = self._slots.get(uid)
+        if slot is None:
+            for slot in range(len(self._slots), self._in_use()):
+                self._slots[self._read_slot(slot)[0]] = slot
+            slot = self._slots.get(uid)
+            if slot is None:
+                return None
+        return self._row(self._read_slot(slot))
+
+    def read_all(self) -> dict:
+        """Returns the state of every published camera, keyed by uid."""
+        result = {}
+        for slot in range(self._in_use()):
+            body = self._read_slot(slot)
+            self._slots[body[0]] = slot
+            result[body[0]] = self._row(body)
+        return result
+
+    def close(self) -> None:
+        """Detach from the block."""
+        self._buf = None
+        self._shm.close()
@@ -0,0 +1,123 @@
+"""Local stand-in for a SecuritySpy web server, used for load testing."""
+import asyncio
+import logging
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+# Smallest valid JPEG (1x1 pixel), returned for every ++image request.
+SNAPSHOT_JPEG = bytes.fromhex(
+    "ffd8ffe000104a46494600010100000100010000ffdb004300080606070605080707070909080a0c140d0c0b0b0c1912130f141d1a1f1e1d1a1c1c20242e2720222c231c1c2837292c30313434341f27393d38323c2e333432"
+    "ffc0000b080001000101011100ffc4001f0000010501010101010100000000000000000102030405060708090a0bffc400b5100002010303020403050504040000017d01020300041105122131410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a25262728292a3435363738393a434445464748494a535455565758595a636465666768696a737475767778797a838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1f2f3f4f5f6f7f8f9fa"
+    "ffda0008010100003f00fbd3ffd9"
+)
+
+def system_info_xml(cameras: int = 4, name: str = "SecuritySpy Simulator") -> str:
+    """Returns a ++systemInfo document with the given number of cameras."""
+    rows = []
+    for uid in range(cameras):
+        rows.append(
+            "<camera>"
+            f"<number>{uid}</number>"
+            "<connected>yes</connected>"
+            "<hasaudio>no</hasaudio>"
+            "<ptzcapabilities>0</ptzcapabilities>"
+            "<timesincelastframe>0</timesincelastframe>"
+            "<timesincelastmotion>42</timesincelastmotion>"
+            "<width>1920</width>"
+            "<height>1080</height>"
+            "<mode-c>disarmed</mode-c>"
+            "<mode-m>armed</mode-m>"
+            "<mode-a>armed</mode-a>"
+            f"<name>{escape(f'Camera {uid}')}</name>"
+            "<mdsensitivity>50</mdsensitivity>"
+            "<devicename>ONVIF</devicename>"
+            "<devicetype>Network</devicetype>"
+            f"<address>192.168.1.{100 + uid}</address>"
+            "<port>80</port>"
+            "<port-rtsp>554</port-rtsp>"
+            "<overlay>no</overlay>"
+            "<overlaytext>+d</overlaytext>"
+            "<transformflags>0</transformflags>"
+            "<mdtriggertimex2>2</mdtriggertimex2>"
+            "<mdmaskmotion>no</mdmaskmotion>"
+            "<aftriggertime>0</aftriggertime>"
+            "<actionscriptname/>"
+            "<actionsoundname/>"
+            "<actionresettime>60</actionresettime>"
+            "</camera>"
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        "<system>"
+        f"<server><name>{escape(name)}</name><version>5.3.2</version></server>"
+        f"<cameralist>{''.join(rows)}</cameralist>"
+        "</system>"
+    )
+
+class SecuritySpySimulator:
+    """Serves ++systemInfo, ++image and ++eventStream from memory."""
+
+    def __init__(self, cameras: int = 4, event_interval: float = 1.0, latency: float = 0.0):
+        self._system_info = system_info_xml(cameras)
+        self._cameras = cameras
+        self._event_interval = event_interval
+        self._latency = latency
+        self._runner = None
+        self.requests = {}
+        self.host = "127.0.0.1"
+        self.port = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving and return the bound port."""
+        app = web.Application()
+        app.router.add_get("/{command}", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.host = host
+        self.port = self._runner.addresses[0][1]
+        _LOGGER.debug("Simulator listening on %s:%s", self.host, self.port)
+        return self.port
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request):
+        # SecuritySpy separates the command from its arguments with "&"
+        # as well as "?", so match on the start of the path.
+        command = request.match_info["command"]
+        name = command.split("&")[0]
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if command.startswith("++systemInfo"):
+            return web.Response(text=self._system_info, content_type="text/xml")
+        if command.startswith("++image"):
+            return web.Response(body=SNAPSHOT_JPEG, content_type="image/jpeg")
+        if command.startswith("++eventStream"):
+            return await self._event_stream(request)
+        raise web.HTTPNotFound()
+
+    async def _event_stream(self, request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        counter = 0
+        while True:
+            camera_id = (counter // 2) % self._cameras
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            event_type = "TRIGGER_M 1" if counter % 2 == 0 else "FILE /Volumes/Video/clip.m4v"
+            line = f"{timestamp} {counter} {camera_id} {event_type}\r\n"
+            try:
+                await response.write(line.encode())
+            except ConnectionResetError:
+                return response
+            counter += 1
+            await asyncio.sleep(self._event_interval)